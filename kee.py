@@ -5,14 +5,30 @@ Kee — AWS CLI profile manager
 A simple tool to manage multiple AWS accounts with SSO and easy account switching.
 """
 
-import argparse
+from __future__ import annotations
+
+import copy
 import json
 import os
+import re
+import signal
 import subprocess
 import sys
 from pathlib import Path
-from typing import Dict
-import configparser
+
+try:
+    import orjson
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _json_loads = orjson.loads
+except ImportError:
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    _json_loads = json.loads
 
 BOLD_WHITE = "\033[1;37m"
 RESET = "\033[0m"
@@ -35,29 +51,175 @@ def hlt(text):
     return f"{BOLD_WHITE}{text}{RESET}"
 
 
+# Highlighted labels that never change, built once
+_H_ACCOUNT = hlt("Account:")
+_H_ROLE = hlt("Role:")
+_H_KEE = hlt("Kee")
+_H_TRY = hlt("Try:")
+_H_TIP = hlt("Tip:")
+_H_NOTE = hlt("Note:")
+_H_WARNING = hlt("Warning:")
+_H_EXIT = hlt("exit")
+
+
+_SECTION_RE = re.compile(r"^\[([^\]]+)\]\s*$")
+_KV_RE = re.compile(r"^([^=:]+?)\s*[=:]\s*(.*)$")
+
+
+def parse_ini(text: str) -> dict[str, dict[str, str]]:
+    """Parse INI content into a dict of sections in a single pass.
+
+    Accepts the same "key = value" and "key: value" lines as configparser and
+    raises ValueError on anything else, so a file is never rewritten with
+    lines silently dropped.
+    """
+    data: dict[str, dict[str, str]] = {}
+    section: dict[str, str] | None = None
+    key: str | None = None
+    key_indent = 0
+    for lineno, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if not stripped or stripped[0] in "#;":
+            continue
+
+        # Lines indented past their key continue its value (e.g. nested s3 settings)
+        indent = len(line) - len(line.lstrip())
+        if key is not None and section is not None and indent > key_indent:
+            section[key] += "\n" + line.rstrip()
+            continue
+
+        match = _SECTION_RE.match(stripped)
+        if match:
+            section = data.setdefault(match.group(1), {})
+            key = None
+            continue
+
+        match = _KV_RE.match(stripped)
+        if match is None or section is None:
+            raise ValueError(f"Unable to parse line {lineno}: {stripped}")
+        key = match.group(1)
+        key_indent = indent
+        section[key] = match.group(2)
+
+    return data
+
+
+def load_ini(path: Path) -> dict[str, dict[str, str]]:
+    """Parse an INI file, returning an empty dict if it doesn't exist."""
+    try:
+        return parse_ini(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def _atomic_write(path: Path, data: bytes):
+    """Write data through a temporary file and os.replace to avoid torn files."""
+    import tempfile  # Only needed when saving, keep it off the startup path
+
+    target = path.resolve()  # Keep symlinked configs (e.g. dotfiles) intact
+    try:
+        mode = target.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+
+    # mkstemp picks a unique name and creates the file 0600, like the AWS CLI
+    fd, tmp = tempfile.mkstemp(
+        dir=target.parent, prefix=target.name + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if mode is not None:
+                os.chmod(tmp, mode)  # Before any data lands in the file
+            f.write(data)
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
 class KeeConfig:
     """Manages configuration storage."""
 
     def __init__(self):
         self.config_dir = Path.home() / ".aws"
         self.config_file = self.config_dir / "kee.json"
+        self.current_file = self.config_dir / "kee.lock"
+        self._cache = None
+        self._cache_key = None
+
+    def _ensure_dir(self):
+        """Create the config directory; only needed before the first write."""
         self.config_dir.mkdir(exist_ok=True)
 
-    def load_config(self) -> Dict:
-        """Load configuration."""
-        if not self.config_file.exists():
-            return {"accounts": {}, "current_account": None}
+    def _stat_key(self):
+        st = self.config_file.stat()
+        return (st.st_mtime_ns, st.st_size)
 
+    def load_config(self) -> dict:
+        """Load configuration, reusing the parsed file while it is unchanged."""
+        try:
+            with open(self.config_file, "rb") as f:
+                st = os.fstat(f.fileno())
+                key = (st.st_mtime_ns, st.st_size)
+                if key != self._cache_key:
+                    self._cache = _json_loads(f.read())
+                    self._cache_key = key
+        except (ValueError, OSError):  # Missing file, invalid JSON or UTF-8
+            return {"accounts": {}}
+
+        config = copy.deepcopy(self._cache)
+        if "current_account" in config:
+            self._migrate_current(config)
+        return config
+
+    def _migrate_current(self, config: dict):
+        """Move a current account pointer left by older versions out of kee.json."""
+        current = config.pop("current_account")
         try:
-            with open(self.config_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {"accounts": {}, "current_account": None}
+            if current and not self.current_file.exists():
+                self.save_current(current)
+            self.save_config(config)
+        except OSError:
+            pass  # Read-only home; try again on the next load
 
-    def save_config(self, config: Dict):
-        """Save configuration."""
-        with open(self.config_file, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=2)
+    def save_config(self, config: dict):
+        """Save the account list.
+
+        The current account lives in its own marker file (see save_current) so
+        switching accounts never rewrites this file.
+        """
+        self._ensure_dir()
+        _atomic_write(self.config_file, _json_dumps(config))
+
+        self._cache = copy.deepcopy(config)
+        self._cache_key = self._stat_key()
+
+    def _read_current(self) -> str | None:
+        try:
+            return self.current_file.read_text(encoding="utf-8") or None
+        except OSError:
+            return None
+
+    def load_current(self) -> str | None:
+        """Return the account whose sub-shell is running, if any."""
+        current = self._read_current()
+        if current is None:
+            # Loading kee.json migrates a pointer left there by older versions
+            self.load_config()
+            current = self._read_current()
+        return current
+
+    def save_current(self, account_name: str | None):
+        """Record the current account, or clear it when None."""
+        if account_name is None:
+            self.current_file.unlink(missing_ok=True)
+            return
+
+        self._ensure_dir()
+        self.current_file.write_text(account_name, encoding="utf-8")
 
 
 class AWSConfigManager:
@@ -66,39 +228,45 @@ class AWSConfigManager:
     def __init__(self):
         self.aws_config_file = Path.home() / ".aws" / "config"
 
-    def _write_config_with_formatting(self, config: configparser.ConfigParser):
+    def _render_config(self, data: dict[str, dict[str, str]]) -> bytes:
+        """Render config sections with proper formatting and "\n" line endings."""
+        parts = []
+        for section_name, items in data.items():
+            parts.append(f"[{section_name}]\n")
+            parts.extend(f"{key} = {value}\n" for key, value in items.items())
+            parts.append("\n")  # Add empty line after each section
+
+        return "".join(parts).encode("utf-8")
+
+    def _write_config(self, data: dict[str, dict[str, str]]):
         """Write config file with proper formatting and cross-platform compatibility."""
-        with open(self.aws_config_file, "w", encoding="utf-8", newline="\n") as f:
-            for section_name in config.sections():
-                f.write(f"[{section_name}]\n")
-                for key, value in config.items(section_name):
-                    f.write(f"{key} = {value}\n")
-                f.write("\n")  # Add empty line after each section
+        _atomic_write(self.aws_config_file, self._render_config(data))
 
     def remove_profile(self, profile_name: str):
         """Remove a profile from AWS config."""
         if not self.aws_config_file.exists():
             return
 
-        config = configparser.ConfigParser()
-        config.read(self.aws_config_file, encoding="utf-8")
+        config = load_ini(self.aws_config_file)
 
         section_name = (
             f"profile {profile_name}" if profile_name != "default" else "default"
         )
 
-        if config.has_section(section_name):
-            config.remove_section(section_name)
-            self._write_config_with_formatting(config)
+        if config.pop(section_name, None) is not None:
+            self._write_config(config)
 
     def reformat_config_file(self):
         """Reformat the entire AWS config file with proper spacing."""
         if not self.aws_config_file.exists():
             return
 
-        config = configparser.ConfigParser()
-        config.read(self.aws_config_file, encoding="utf-8")
-        self._write_config_with_formatting(config)
+        existing = self.aws_config_file.read_bytes()
+        rendered = self._render_config(parse_ini(existing.decode("utf-8")))
+
+        # Leave the file (and its mtime) alone if it's already well-formed
+        if rendered != existing:
+            _atomic_write(self.aws_config_file, rendered)
 
 
 class KeeManager:
@@ -107,22 +275,30 @@ class KeeManager:
     def __init__(self):
         self.config = KeeConfig()
         self.aws_config = AWSConfigManager()
+        self._cred_cache: dict[str, tuple[int, bool]] = {}
+        self._aws_probe_env_overrides = {"AWS_CLI_AUTO_PROMPT": "off", "AWS_PAGER": ""}
+
+    def _emit(self, *lines: str):
+        """Print several lines with a single write."""
+        sys.stdout.write("\n".join(lines) + "\n")
+        # Flush so the output lands before any subprocess writes to the terminal
+        sys.stdout.flush()
 
     def add_account(self, account_name: str) -> bool:
         """Add a new AWS account with interactive configuration."""
         profile_name = account_name
 
-        print("\n Starting SSO configuration...")
-        print(" (This will open your browser to complete authentication.)")
-        print("\n Follow the prompts:")
-        print(f"  {hlt('1.')} Enter your SSO start URL")
-        print(f"  {hlt('2.')} Enter your SSO region")
-        print(f"  {hlt('3.')} Authenticate in your browser")
-        print(f"  {hlt('4.')} Select your AWS account")
-        print(f"  {hlt('5.')} Select your role")
-        print(f"  {hlt('7.')} Choose your output format (recommend: json)")
-        print(
-            f"\n  {hlt('Tip:')} A session can be liked to multiple profiles.\n  When prompted for a 'session name', use something generic, like your company name.\n"
+        self._emit(
+            "\n Starting SSO configuration...",
+            " (This will open your browser to complete authentication.)",
+            "\n Follow the prompts:",
+            f"  {hlt('1.')} Enter your SSO start URL",
+            f"  {hlt('2.')} Enter your SSO region",
+            f"  {hlt('3.')} Authenticate in your browser",
+            f"  {hlt('4.')} Select your AWS account",
+            f"  {hlt('5.')} Select your role",
+            f"  {hlt('7.')} Choose your output format (recommend: json)",
+            f"\n  {_H_TIP} A session can be liked to multiple profiles.\n  When prompted for a 'session name', use something generic, like your company name.\n",
         )
 
         try:
@@ -137,7 +313,7 @@ class KeeManager:
                 return False
 
             print(
-                f"\n {hlt('Note:')} You can ignore the AWS CLI example above.\n {hlt('Kee')} will handle profiles for you."
+                f"\n {_H_NOTE} You can ignore the AWS CLI example above.\n {_H_KEE} will handle profiles for you."
             )
 
             # Reformat the AWS config file to add proper spacing
@@ -168,7 +344,7 @@ class KeeManager:
                 print(
                     "\n [X] I created the profile but credentials may need a refresh..."
                 )
-                print(f" {hlt('Try:')} aws sso login --profile {profile_name}")
+                print(f" {_H_TRY} aws sso login --profile {profile_name}")
 
             return True
 
@@ -179,17 +355,16 @@ class KeeManager:
             print(f" [X] I got an error while adding the account: {hlt(e)}")
             return False
 
-    def _read_profile_info(self, profile_name: str) -> Dict:
+    def _read_profile_info(self, profile_name: str) -> dict:
         """Read profile information from AWS config."""
         try:
-            config = configparser.ConfigParser()
-            config.read(self.aws_config.aws_config_file, encoding="utf-8")
+            config = load_ini(self.aws_config.aws_config_file)
 
             section_name = f"profile {profile_name}"
-            if not config.has_section(section_name):
+            if section_name not in config:
                 return {}
 
-            profile_info = dict(config.items(section_name))
+            profile_info = dict(config[section_name])
 
             # Handle SSO session format
             if "sso_session" in profile_info:
@@ -198,8 +373,8 @@ class KeeManager:
 
                 # Get SSO details from the sso-session section
                 sso_section_name = f"sso-session {session_name}"
-                if config.has_section(sso_section_name):
-                    sso_info = dict(config.items(sso_section_name))
+                if sso_section_name in config:
+                    sso_info = config[sso_section_name]
                     profile_info["sso_start_url"] = sso_info.get("sso_start_url", "")
                     profile_info["sso_region"] = sso_info.get("sso_region", "")
             else:
@@ -218,11 +393,11 @@ class KeeManager:
             print(f" [X] Error reading profile info: {hlt(e)}")
             return {}
 
-    def list_accounts(self):
-        """List all configured accounts."""
+    def list_accounts(self, check: bool = False):
+        """List all configured accounts, optionally checking their credentials."""
         config_data = self.config.load_config()
         accounts = config_data.get("accounts", {})
-        current_account = config_data.get("current_account")
+        current_account = self.config.load_current()
 
         if not accounts:
             print(
@@ -230,17 +405,32 @@ class KeeManager:
             )
             return
 
-        print()
+        # Each check spawns an aws subprocess, so run them concurrently
+        valid = {}
+        if check:
+            from concurrent.futures import ThreadPoolExecutor
+
+            profiles = [info["profile_name"] for info in accounts.values()]
+            with ThreadPoolExecutor(max_workers=min(8, len(accounts))) as executor:
+                valid = dict(
+                    zip(accounts, executor.map(self._check_credentials, profiles))
+                )
+
+        lines = [""]
         for account_name, account_info in accounts.items():
             status = " (Current profile)" if account_name == current_account else ""
-            print(f" {hlt(account_name)}{status}")
+            if check:
+                status += " [✓]" if valid[account_name] else " [X]"
+            lines.append(f" {hlt(account_name)}{status}")
 
             # Show account info
             account_id = account_info["sso_account_id"]
             role = account_info["sso_role_name"]
 
-            print(f" • {hlt('Account:')} {account_id}")
-            print(f" • {hlt('Role:')} {role}")
+            lines.append(f" • {_H_ACCOUNT} {account_id}")
+            lines.append(f" • {_H_ROLE} {role}")
+
+        self._emit(*lines)
 
     def remove_account(self, account_name: str) -> bool:
         """Remove an account configuration."""
@@ -263,12 +453,12 @@ class KeeManager:
         profile_name = account_info["profile_name"]
         del accounts[account_name]
 
-        # Clear current account if it's the one being removed
-        if config_data.get("current_account") == account_name:
-            config_data["current_account"] = None
-
         self.config.save_config(config_data)
 
+        # Clear current account if it's the one being removed
+        if self.config.load_current() == account_name:
+            self.config.save_current(None)
+
         # Remove the AWS profile from config file
         hlt_account = hlt(account_name)
         try:
@@ -276,9 +466,9 @@ class KeeManager:
             print(f" [✓] Profile '{hlt_account}' has been removed.")
 
         except Exception as e:
-            print(f" [✓] Profile '{hlt_account}' removed from {hlt('Kee')}.")
+            print(f" [✓] Profile '{hlt_account}' removed from {_H_KEE}.")
             print(
-                f" [!] {hlt('Warning:')} Could not remove AWS profile '{hlt(profile_name)}': {e}"
+                f" [!] {_H_WARNING} Could not remove AWS profile '{hlt(profile_name)}': {e}"
             )
             print(" You may want to remove it manually from ~/.aws/config")
 
@@ -289,8 +479,8 @@ class KeeManager:
         # Check if we're already using a Kee profile
         if os.environ.get("KEE_ACTIVE_PROFILE"):
             current_profile = os.environ.get("KEE_CURRENT_ACCOUNT", "unknown")
-            print(f"\n You are using a {hlt('Kee')} profile: {hlt(current_profile)}")
-            print(f" Exit the current session first by typing '{hlt('exit')}'")
+            print(f"\n You are using a {_H_KEE} profile: {hlt(current_profile)}")
+            print(f" Exit the current session first by typing '{_H_EXIT}'")
             return False
 
         config_data = self.config.load_config()
@@ -343,16 +533,12 @@ class KeeManager:
                 )
                 return False
 
-        # Update current account
-        config_data["current_account"] = account_name
-        self.config.save_config(config_data)
-
-        # Start sub-shell with AWS credentials
-        self._start_subshell(account_name, profile_name)
-
-        # Clear current account when sub-shell exits
-        config_data["current_account"] = None
-        self.config.save_config(config_data)
+        # Mark the current account for as long as the sub-shell runs
+        self.config.save_current(account_name)
+        try:
+            self._start_subshell(account_name, profile_name)
+        finally:
+            self.config.save_current(None)
 
         return True
 
@@ -363,35 +549,52 @@ class KeeManager:
             current = os.environ.get("KEE_CURRENT_ACCOUNT")
             if current:
                 print(f"\n Current profile: {hlt(current)}")
-                print(f" Type '{hlt('exit')}' to return to your main shell.")
+                print(f" Type '{_H_EXIT}' to return to your main shell.")
             else:
-                print(f"\n Active {hlt('Kee')} profile but account name not found.")
+                print(f"\n Active {_H_KEE} profile but account name not found.")
         else:
-            config_data = self.config.load_config()
-            current = config_data.get("current_account")
+            current = self.config.load_current()
 
             if current:
                 print(f"\n Current profile: {hlt(current)}")
             else:
                 print("\n No profile is currently active.")
 
+    def _sso_cache_mtime(self) -> int:
+        """Return the newest mtime in the AWS SSO token cache (0 if unavailable)."""
+        cache_dir = Path.home() / ".aws" / "sso" / "cache"
+        try:
+            return max(
+                (p.stat().st_mtime_ns for p in cache_dir.glob("*.json")), default=0
+            )
+        except OSError:
+            return 0
+
     def _check_credentials(self, profile_name: str) -> bool:
         """Check if AWS credentials are valid."""
-        try:
-            env = os.environ.copy()
-            env["AWS_CLI_AUTO_PROMPT"] = "off"
-            env["AWS_PAGER"] = ""
+        # A fresh `aws sso login` touches the token cache and invalidates the entry
+        cache_mtime = self._sso_cache_mtime()
+        if self._cred_cache.get(profile_name) == (cache_mtime, True):
+            return True
 
+        try:
+            env = {**os.environ, **self._aws_probe_env_overrides}
             result = subprocess.run(
                 ["aws", "sts", "get-caller-identity", "--profile", profile_name],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
                 timeout=10,
                 check=False,
+                close_fds=True,
                 env=env,
             )
-            return result.returncode == 0
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError):
+            if result.returncode != 0:
+                return False
+
+            self._cred_cache[profile_name] = (cache_mtime, True)
+            return True
+        except (subprocess.TimeoutExpired, subprocess.SubprocessError, OSError):
+            # OSError covers the AWS CLI not being installed or not on PATH
             return False
 
     def _sso_login(self, profile_name: str) -> bool:
@@ -401,11 +604,30 @@ class KeeManager:
                 ["aws", "sso", "login", "--profile", profile_name],
                 timeout=300,
                 check=False,
+                close_fds=True,
             )
             return result.returncode == 0
         except (subprocess.TimeoutExpired, subprocess.SubprocessError):
             return False
 
+    def _run_shell(self, shell: str, env: dict):
+        """Run a shell and wait for it to exit."""
+        if not hasattr(os, "posix_spawnp"):  # Windows
+            subprocess.run([shell], env=env, check=False)
+            return
+
+        # Like subprocess.run's restore_signals, undo Python's ignored signals
+        pid = os.posix_spawnp(
+            shell, [shell], env, setsigdef=(signal.SIGPIPE, signal.SIGXFSZ)
+        )
+        try:
+            os.waitpid(pid, 0)
+        except KeyboardInterrupt:
+            # Like subprocess.run, don't leave the shell running behind us
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            raise
+
     def _start_subshell(self, account_name: str, profile_name: str):
         """Start a sub-shell with AWS credentials configured."""
         # Get current shell - cross-platform compatible
@@ -415,77 +637,105 @@ class KeeManager:
             current_shell = os.environ.get("SHELL", "/bin/bash")
 
         # Prepare environment
-        env = os.environ.copy()
-        env["AWS_PROFILE"] = profile_name
-        env["KEE_CURRENT_ACCOUNT"] = account_name
-        env["KEE_ACTIVE_PROFILE"] = "1"
+        env = {
+            **os.environ,
+            "AWS_PROFILE": profile_name,
+            "KEE_CURRENT_ACCOUNT": account_name,
+            "KEE_ACTIVE_PROFILE": "1",
+        }
 
         # Update prompt for Unix-like systems only
         if os.name != "nt":
-            if "PS1" in env:
-                env["PS1"] = f"aws:{account_name} {env['PS1']}"
-            else:
-                env["PS1"] = f"aws:{account_name} $ "
+            env["PS1"] = f"aws:{account_name} {env.get('PS1', '$ ')}"
 
         # Show the Kee banner and profile info
-        print(get_kee_art())
-        print(f"    Profile: {hlt(account_name)}")
-        print("\n    Starting a sub-shell...")
-        print(f"    Type '{hlt('exit')}' to return to your main shell.")
+        self._emit(
+            get_kee_art(),
+            f"    Profile: {hlt(account_name)}",
+            "\n    Starting a sub-shell...",
+            f"    Type '{_H_EXIT}' to return to your main shell.",
+        )
 
         try:
-            subprocess.run([current_shell], env=env, check=False)
+            self._run_shell(current_shell, env)
         except KeyboardInterrupt:
             pass
 
         print(f"\n {hlt(account_name)} — Session ended.")
 
 
-def main():
-    """Main entry point."""
-    # Set UTF-8 encoding for Windows compatibility
-    if sys.platform.startswith("win"):
-        import codecs
-
-        sys.stdout = codecs.getwriter("utf-8")(sys.stdout.buffer, "strict")
-        sys.stderr = codecs.getwriter("utf-8")(sys.stderr.buffer, "strict")
-
-    parser = argparse.ArgumentParser(
-        description=get_kee_art(),
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
+EPILOG = """
 Examples:
   kee add myaccount          Add a new AWS account
   kee use myaccount          Use an account (starts sub-shell)
   kee list                   List all configured accounts
+  kee list --check           List accounts and check their credentials
   kee current                Show current active account
   kee remove myaccount       Remove an account configuration
-        """,
-    )
+"""
 
-    subparsers = parser.add_subparsers(dest="command", help="Available commands")
+# (command, help, [(argument, add_argument kwargs), ...])
+COMMANDS = [
+    (
+        "add",
+        "Add a new AWS account",
+        [("account_name", {"help": "Name for the account"})],
+    ),
+    ("use", "Use an account", [("account_name", {"help": "Account to use"})]),
+    (
+        "list",
+        "List all configured accounts",
+        [
+            (
+                "--check",
+                {
+                    "action": "store_true",
+                    "help": "Check which accounts have valid credentials",
+                },
+            )
+        ],
+    ),
+    ("current", "Show current active account", []),
+    ("remove", "Remove an account", [("account_name", {"help": "Account to remove"})]),
+]
 
-    # Add command
-    subparsers.add_parser("add", help="Add a new AWS account").add_argument(
-        "account_name", help="Name for the account"
-    )
 
-    # Use command
-    subparsers.add_parser("use", help="Use an account").add_argument(
-        "account_name", help="Account to use"
-    )
+def get_help():
+    """Return the top-level help text without building an argparse parser."""
+    names = ",".join(name for name, _, _ in COMMANDS)
+    lines = [f"usage: kee [-h] {{{names}}} ...", get_kee_art(), "", "commands:"]
+    lines.extend(f"  {name:<10}{help_text}" for name, help_text, _ in COMMANDS)
+    return "\n".join(lines) + "\n" + EPILOG.rstrip()
+
 
-    # List command
-    subparsers.add_parser("list", help="List all configured accounts")
+def main():
+    """Main entry point."""
+    # Set UTF-8 encoding for Windows compatibility (already set with PYTHONUTF8=1
+    # or a UTF-8 console code page)
+    encoding = (sys.stdout.encoding or "").lower().replace("-", "")
+    if sys.platform.startswith("win") and encoding != "utf8":
+        sys.stdout.reconfigure(encoding="utf-8")
+        sys.stderr.reconfigure(encoding="utf-8")
+
+    # Nothing to parse, so skip importing and building argparse entirely
+    if len(sys.argv) == 1:
+        print(get_help())
+        return
 
-    # Current command
-    subparsers.add_parser("current", help="Show current active account")
+    import argparse
 
-    # Remove command
-    subparsers.add_parser("remove", help="Remove an account").add_argument(
-        "account_name", help="Account to remove"
+    parser = argparse.ArgumentParser(
+        description=get_kee_art(),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=EPILOG,
     )
 
+    subparsers = parser.add_subparsers(dest="command", help="Available commands")
+    for name, help_text, arguments in COMMANDS:
+        command_parser = subparsers.add_parser(name, help=help_text)
+        for argument, options in arguments:
+            command_parser.add_argument(argument, **options)
+
     args = parser.parse_args()
 
     if not args.command:
@@ -501,7 +751,7 @@ Examples:
         elif args.command == "use":
             kee.use_account(args.account_name)
         elif args.command == "list":
-            kee.list_accounts()
+            kee.list_accounts(args.check)
         elif args.command == "current":
             kee.current_account()
         elif args.command == "remove":
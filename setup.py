@@ -31,6 +31,9 @@ setup(
         # No external dependencies - uses only Python standard library
     ],
     extras_require={
+        'fast': [
+            'orjson',
+        ],
         'test': [
             'pytest>=6.0',
             'pytest-cov>=2.0',
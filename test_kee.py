@@ -5,591 +5,871 @@ Unit tests for Kee — AWS CLI profile manager
 
 import json
 import os
+import re
+import signal
 import tempfile
-import unittest
+from functools import lru_cache
 from pathlib import Path
-from unittest.mock import Mock, patch
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+import kee
 
 # Import the modules we're testing
-from kee import KeeConfig, AWSConfigManager, KeeManager, get_kee_art
+from kee import (
+    KeeConfig,
+    AWSConfigManager,
+    KeeManager,
+    get_kee_art,
+    load_ini,
+    main,
+    parse_ini,
+)
+
+_BOLD = "\x1b[1;37m"
+_RESET = "\x1b[0m"
+_MSG_NO_ACCOUNTS = (
+    f"\n No accounts configured.\n Use '{_BOLD}kee add <account_name>{_RESET}'"
+    " to add an account.\n"
+)
+_MSG_NOT_FOUND = f"\n Account '{_BOLD}nonexistent{_RESET}' not found.\n"
+_MSG_IN_SESSION = f"You are using a {_BOLD}Kee{_RESET} profile: {_BOLD}existing{_RESET}"
+_MSG_CURRENT = f"Current profile: {_BOLD}test-account{_RESET}"
+
+
+@lru_cache(maxsize=1)
+def _empty_config():
+    """A shared read-only ``{"accounts": {}}`` for comparisons and stand-ins."""
+    return MappingProxyType({"accounts": MappingProxyType({})})
+
+
+_TEST_CONFIG = {"accounts": {"test-account": {"profile_name": "test-account"}}}
+_TEST_CONFIG_BYTES = json.dumps(_TEST_CONFIG).encode()
+
+_SSO_CONFIG = b"""[profile test]
+sso_role_name = AdministratorAccess
+sso_session = test
+sso_account_id = 123456789098
+output = json
 
+[profile other-profile]
+sso_role_name = AdministratorAccess
+"""
 
-class TestKeeArt(unittest.TestCase):
-    """Test the ASCII art function."""
+_UNFORMATTED_SSO_CONFIG = b"""[profile test]
+sso_role_name = AdministratorAccess
+sso_session = test
+[profile other-profile]
+sso_role_name = AdministratorAccess"""
 
-    def test_get_kee_art_returns_string(self):
-        """Test that get_kee_art returns a string."""
-        art = get_kee_art()
-        self.assertIsInstance(art, str)
-        self.assertIn("AWS CLI profile manager", art)
-        self.assertTrue(len(art) > 0)
 
+def test_get_kee_art():
+    """Test that get_kee_art returns the banner string."""
+    art = get_kee_art()
+    assert isinstance(art, str)
+    assert "AWS CLI profile manager" in art
 
-class TestKeeConfig(unittest.TestCase):
-    """Test the KeeConfig class."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.temp_dir = tempfile.mkdtemp()
-        self.config_dir = Path(self.temp_dir) / ".aws"
-        self.config_file = self.config_dir / "kee.json"
+@patch("sys.argv", ["kee"])
+def test_main_without_arguments_prints_help(capsys):
+    """Test that running without a command prints help without argparse."""
+    with patch.dict("sys.modules", {"argparse": None}):
+        main()
 
-    def tearDown(self):
-        """Clean up test fixtures."""
-        import shutil
+    help_text = capsys.readouterr().out
+    assert "usage: kee" in help_text
+    assert "AWS CLI profile manager" in help_text
+    for command in ("add", "use", "list", "current", "remove"):
+        assert f"  {command} " in help_text
 
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    @patch("kee.Path.home")
-    def test_init_creates_config_dir(self, mock_home):
-        """Test that KeeConfig creates the .aws directory."""
-        mock_home.return_value = Path(self.temp_dir)
-        config = KeeConfig()
+@patch("sys.argv", ["kee"])
+@patch("sys.platform", "win32")
+def test_main_reconfigures_windows_console():
+    """Test that a non-UTF-8 Windows console is switched to UTF-8."""
+    for encoding, expected in (("cp1252", True), ("utf-8", False)):
+        mock_stdout = Mock(encoding=encoding)
+        mock_stderr = Mock()
+        with patch("sys.stdout", mock_stdout), patch("sys.stderr", mock_stderr):
+            main()
 
-        self.assertTrue(self.config_dir.exists())
-        self.assertEqual(config.config_file, self.config_file)
+        assert mock_stdout.reconfigure.called == expected
+        assert mock_stderr.reconfigure.called == expected
 
-    @patch("kee.Path.home")
-    def test_load_config_default_when_no_file(self, mock_home):
-        """Test loading default config when file doesn't exist."""
-        mock_home.return_value = Path(self.temp_dir)
-        config = KeeConfig()
 
-        result = config.load_config()
-        expected = {"accounts": {}, "current_account": None}
-        self.assertEqual(result, expected)
+@pytest.fixture(scope="session")
+def _root(tmp_path_factory):
+    """One temporary directory shared by the whole session."""
+    return tmp_path_factory.mktemp("kee")
 
-    @patch("kee.Path.home")
-    def test_load_config_from_file(self, mock_home):
-        """Test loading config from existing file."""
-        mock_home.return_value = Path(self.temp_dir)
-        config = KeeConfig()
 
-        # Create test config
-        test_config = {
-            "accounts": {"test-account": {"profile_name": "test-account"}},
-            "current_account": "test-account",
-        }
+@pytest.fixture
+def sandbox(_root, request):
+    """A fresh per-test directory under the session root."""
+    # Like tmp_path: a safe prefix from the test name, made unique by mkdtemp
+    prefix = re.sub(r"\W", "_", request.node.name)[:30]
+    return Path(tempfile.mkdtemp(prefix=prefix, dir=_root))
 
-        # Write test config
-        self.config_dir.mkdir(parents=True, exist_ok=True)
-        with open(self.config_file, "w") as f:
-            json.dump(test_config, f)
-
-        result = config.load_config()
-        self.assertEqual(result, test_config)
-
-    @patch("kee.Path.home")
-    def test_load_config_handles_invalid_json(self, mock_home):
-        """Test loading config handles invalid JSON gracefully."""
-        mock_home.return_value = Path(self.temp_dir)
-        config = KeeConfig()
-
-        # Create invalid JSON file
-        self.config_dir.mkdir(parents=True, exist_ok=True)
-        with open(self.config_file, "w") as f:
-            f.write("invalid json content")
-
-        result = config.load_config()
-        expected = {"accounts": {}, "current_account": None}
-        self.assertEqual(result, expected)
-
-    @patch("kee.Path.home")
-    def test_save_config(self, mock_home):
-        """Test saving config to file."""
-        mock_home.return_value = Path(self.temp_dir)
-        config = KeeConfig()
-
-        test_config = {
-            "accounts": {"test-account": {"profile_name": "test-account"}},
-            "current_account": "test-account",
-        }
 
-        config.save_config(test_config)
+@pytest.fixture
+def home(sandbox, monkeypatch):
+    """Point Path.home() at the test's sandbox directory."""
+    monkeypatch.setattr(kee.Path, "home", classmethod(lambda cls: sandbox))
+    return sandbox
 
-        # Verify file was created and contains correct data
-        self.assertTrue(self.config_file.exists())
-        with open(self.config_file, "r") as f:
-            saved_config = json.load(f)
-        self.assertEqual(saved_config, test_config)
 
+# KeeConfig
 
-class TestAWSConfigManager(unittest.TestCase):
-    """Test the AWSConfigManager class."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.temp_dir = tempfile.mkdtemp()
-        self.aws_config_file = Path(self.temp_dir) / ".aws" / "config"
-        self.aws_config_file.parent.mkdir(parents=True, exist_ok=True)
+def test_keeconfig_init_defers_config_dir(home):
+    """Test that KeeConfig only creates the .aws directory on save."""
+    config_dir = home / ".aws"
+    config = KeeConfig()
 
-    def tearDown(self):
-        """Clean up test fixtures."""
-        import shutil
+    assert not config_dir.exists()
+    assert config.config_file == config_dir / "kee.json"
 
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    config.save_config({"accounts": {}})
+    assert config_dir.exists()
 
-    @patch("kee.Path.home")
-    def test_init(self, mock_home):
-        """Test AWSConfigManager initialization."""
-        mock_home.return_value = Path(self.temp_dir)
-        manager = AWSConfigManager()
 
-        expected_path = Path(self.temp_dir) / ".aws" / "config"
-        self.assertEqual(manager.aws_config_file, expected_path)
+def test_load_config_default_when_no_file(home):
+    """Test loading default config when file doesn't exist."""
+    config = KeeConfig()
 
-    @patch("kee.Path.home")
-    def test_remove_profile_nonexistent_file(self, mock_home):
-        """Test removing profile when config file doesn't exist."""
-        mock_home.return_value = Path(self.temp_dir)
-        manager = AWSConfigManager()
+    assert config.load_config() == _empty_config()
 
-        # Should not raise an exception
-        manager.remove_profile("test-profile")
 
-    @patch("kee.Path.home")
-    def test_remove_profile_existing(self, mock_home):
-        """Test removing an existing profile."""
-        mock_home.return_value = Path(self.temp_dir)
-        manager = AWSConfigManager()
+def test_load_config_from_file(home):
+    """Test loading config from existing file."""
+    config_file = home / ".aws" / "kee.json"
+    config = KeeConfig()
 
-        # Create test config file
-        config_content = """[profile test]
-sso_role_name = AdministratorAccess
+    # Write test config
+    config_file.parent.mkdir(parents=True, exist_ok=True)
+    config_file.write_bytes(_TEST_CONFIG_BYTES)
+
+    assert config.load_config() == _TEST_CONFIG
+
+
+def test_load_config_handles_invalid_json(home):
+    """Test loading config handles invalid JSON gracefully."""
+    config_file = home / ".aws" / "kee.json"
+    config = KeeConfig()
+
+    # Create invalid JSON file
+    config_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(config_file, "w") as f:
+        f.write("invalid json content")
+
+    assert config.load_config() == _empty_config()
+
+
+def test_load_config_is_cached(home):
+    """Test that an unchanged file is only parsed once."""
+    config = KeeConfig()
+    config.save_config({"accounts": {}})
+
+    with patch("kee._json_loads") as mock_load:
+        first = config.load_config()
+        first["accounts"]["mutated"] = {}
+        second = config.load_config()
+
+    mock_load.assert_not_called()
+    assert second == _empty_config()
+
+
+def test_load_config_reloads_modified_file(home):
+    """Test that the cache is invalidated when the file changes."""
+    config = KeeConfig()
+    config.save_config({"accounts": {}})
+    config.load_config()
+
+    config.config_file.write_bytes(b'{"accounts": {"other": {}}}')
+
+    assert config.load_config()["accounts"] == {"other": {}}
+
+
+def test_save_config(home):
+    """Test saving config to file."""
+    config_dir = home / ".aws"
+    config_file = config_dir / "kee.json"
+    config = KeeConfig()
+
+    config.save_config(_TEST_CONFIG)
+
+    # Verify file was created and contains correct data
+    assert config_file.exists()
+    assert not list(config_dir.glob("*.tmp"))
+    assert json.loads(config_file.read_bytes()) == _TEST_CONFIG
+
+
+def test_save_config_cleans_up_on_failure(home, monkeypatch):
+    """Test that a failed save leaves the old file and no temporary file."""
+    config = KeeConfig()
+    config.save_config(_TEST_CONFIG)
+
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(kee.os, "replace", fail_replace)
+    with pytest.raises(OSError):
+        config.save_config({"accounts": {}})
+
+    assert not list(config.config_dir.glob("*.tmp"))
+    assert json.loads(config.config_file.read_bytes()) == _TEST_CONFIG
+
+
+def test_save_and_load_current(home):
+    """Test recording and clearing the current account marker."""
+    config = KeeConfig()
+
+    assert config.load_current() is None
+
+    config.save_current("test-account")
+    assert config.load_current() == "test-account"
+    assert not config.config_file.exists()
+
+    config.save_current(None)
+    assert config.load_current() is None
+    assert not config.current_file.exists()
+
+
+def test_load_current_migrates_legacy_config(home):
+    """Test moving the current account stored in kee.json to the marker file."""
+    config_file = home / ".aws" / "kee.json"
+    config = KeeConfig()
+
+    config_file.parent.mkdir(parents=True, exist_ok=True)
+    config_file.write_bytes(b'{"accounts": {}, "current_account": "legacy"}')
+
+    assert config.load_current() == "legacy"
+    assert config.current_file.read_text() == "legacy"
+    assert json.loads(config_file.read_bytes()) == _empty_config()
+
+
+# AWSConfigManager
+
+
+@pytest.fixture
+def aws_cfg(home):
+    """The AWS config path under a temporary home, with ``.aws`` created."""
+    aws_cfg = home / ".aws" / "config"
+    aws_cfg.parent.mkdir()
+    return aws_cfg
+
+
+def test_awsconfigmanager_init(aws_cfg):
+    """Test AWSConfigManager initialization."""
+    manager = AWSConfigManager()
+
+    assert manager.aws_config_file == aws_cfg
+
+
+def test_remove_profile_nonexistent_file(home):
+    """Test removing profile when config file doesn't exist."""
+    manager = AWSConfigManager()
+
+    # Should not raise an exception
+    manager.remove_profile("test-profile")
+
+
+def test_remove_profile_existing(aws_cfg):
+    """Test removing an existing profile."""
+    manager = AWSConfigManager()
+
+    # Create test config file
+    aws_cfg.write_bytes(_SSO_CONFIG)
+
+    manager.remove_profile("test")
+
+    # Verify profile was removed
+    content = aws_cfg.read_bytes()
+
+    assert b"profile test" not in content
+    assert b"profile other-profile" in content
+
+
+def test_reformat_config_file(aws_cfg):
+    """Test reformatting config file."""
+    manager = AWSConfigManager()
+
+    # Create test config file without proper spacing
+    aws_cfg.write_bytes(_UNFORMATTED_SSO_CONFIG)
+
+    manager.reformat_config_file()
+
+    # Verify proper formatting
+    content = aws_cfg.read_bytes()
+
+    # Should have an empty line after each section
+    assert b"sso_session = test\n\n[profile other-profile]\n" in content
+    assert content.endswith(b"sso_role_name = AdministratorAccess\n\n")
+
+
+def test_reformat_config_file_skips_formatted(aws_cfg):
+    """Test that an already formatted config file is not rewritten."""
+    manager = AWSConfigManager()
+
+    config_content = b"""[profile test]
 sso_session = test
-sso_account_id = 123456789098
-output = json
 
 [profile other-profile]
 sso_role_name = AdministratorAccess
+
 """
-        with open(self.aws_config_file, "w") as f:
-            f.write(config_content)
+    aws_cfg.write_bytes(config_content)
 
-        manager.remove_profile("test")
+    with patch.object(Path, "write_bytes") as mock_write:
+        manager.reformat_config_file()
 
-        # Verify profile was removed
-        with open(self.aws_config_file, "r") as f:
-            content = f.read()
+    mock_write.assert_not_called()
+    assert aws_cfg.read_bytes() == config_content
 
-        self.assertNotIn("profile test", content)
-        self.assertIn("profile other-profile", content)
 
-    @patch("kee.Path.home")
-    def test_reformat_config_file(self, mock_home):
-        """Test reformatting config file."""
-        mock_home.return_value = Path(self.temp_dir)
-        manager = AWSConfigManager()
+def test_reformat_config_file_keeps_configparser_syntax(aws_cfg):
+    """Test that colon-delimited and indented settings survive a reformat."""
+    aws_cfg.write_bytes(
+        b"[profile keep]\nregion: us-east-1\n  output = json\n[profile other]\n  output = text"
+    )
+    manager = AWSConfigManager()
+
+    manager.reformat_config_file()
+
+    assert aws_cfg.read_bytes() == (
+        b"[profile keep]\nregion = us-east-1\n  output = json\n\n"
+        b"[profile other]\noutput = text\n\n"
+    )
 
-        # Create test config file without proper spacing
-        config_content = """[profile test]
-sso_role_name = AdministratorAccess
-sso_session = test
-[profile other-profile]
-sso_role_name = AdministratorAccess"""
 
-        with open(self.aws_config_file, "w") as f:
-            f.write(config_content)
+def test_reformat_config_file_refuses_unparseable(aws_cfg):
+    """Test that a file with unparseable lines is left untouched."""
+    content = b"[profile test]\nsso_session = test\nnot a setting"
+    aws_cfg.write_bytes(content)
+    manager = AWSConfigManager()
 
+    with pytest.raises(ValueError):
         manager.reformat_config_file()
 
-        # Verify proper formatting
-        with open(self.aws_config_file, "r") as f:
-            content = f.read()
-
-        # Should have empty lines between sections
-        lines = content.split("\n")
-        profile_indices = [
-            i for i, line in enumerate(lines) if line.startswith("[profile")
-        ]
-
-        # Check that there are empty lines after each profile section
-        self.assertTrue(any("" in lines for _ in profile_indices))
-
-
-class TestKeeManager(unittest.TestCase):
-    """Test the KeeManager class."""
-
-    def setUp(self):
-        """Set up test fixtures."""
-        self.temp_dir = tempfile.mkdtemp()
-
-    def tearDown(self):
-        """Clean up test fixtures."""
-        import shutil
-
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_init(self, mock_aws_config, mock_kee_config):
-        """Test KeeManager initialization."""
-        manager = KeeManager()
-
-        mock_kee_config.assert_called_once()
-        mock_aws_config.assert_called_once()
-        self.assertIsNotNone(manager.config)
-        self.assertIsNotNone(manager.aws_config)
-
-    @patch("kee.subprocess.run")
-    @patch("kee.KeeManager._read_profile_info")
-    @patch("kee.KeeManager._check_credentials")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_add_account_success(
-        self,
-        mock_aws_config,
-        mock_kee_config,
-        mock_check_creds,
-        mock_read_profile,
-        mock_subprocess,
-    ):
-        """Test successful account addition."""
-        # Setup mocks
-        mock_subprocess.return_value.returncode = 0
-        mock_read_profile.return_value = {
+    assert aws_cfg.read_bytes() == content
+
+
+@pytest.mark.skipif(os.name == "nt", reason="symlinks require privileges on Windows")
+def test_remove_profile_keeps_symlink(sandbox, aws_cfg):
+    """Test that a symlinked config file is updated in place."""
+    manager = AWSConfigManager()
+
+    target = sandbox / "dotfiles-config"
+    target.write_bytes(b"[profile test]\nsso_session = test\n")
+    os.chmod(target, 0o600)
+    aws_cfg.symlink_to(target)
+
+    manager.remove_profile("test")
+
+    assert aws_cfg.is_symlink()
+    assert target.read_text() == ""
+    assert target.stat().st_mode & 0o777 == 0o600
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX permissions only")
+def test_remove_profile_never_widens_permissions(aws_cfg, monkeypatch):
+    """Test that the temporary file has the target's mode before data is written."""
+    aws_cfg.write_bytes(_SSO_CONFIG)
+    os.chmod(aws_cfg, 0o640)
+    manager = AWSConfigManager()
+
+    modes = []
+    fdopen = os.fdopen
+
+    class _RecordingFile:
+        def __init__(self, f):
+            self._f = f
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return self._f.__exit__(*exc)
+
+        def write(self, data):
+            modes.append(os.fstat(self._f.fileno()).st_mode & 0o777)
+            return self._f.write(data)
+
+    monkeypatch.setattr(kee.os, "fdopen", lambda *a: _RecordingFile(fdopen(*a)))
+
+    manager.remove_profile("test")
+
+    assert modes == [0o640]
+    assert aws_cfg.stat().st_mode & 0o777 == 0o640
+
+
+# load_ini
+
+
+def test_load_ini_missing_file(sandbox):
+    """Test loading a file that doesn't exist."""
+    assert load_ini(sandbox / "config") == {}
+
+
+def test_load_ini_parses_sections(sandbox):
+    """Test parsing sections, comments and continuation lines."""
+    ini_file = sandbox / "config"
+    with open(ini_file, "w") as f:
+        f.write("""# comment
+[profile test]
+sso_session = test
+; another comment
+s3 =
+  max_concurrent_requests = 20
+
+[sso-session test]
+sso_start_url = https://example.awsapps.com/start
+sso_registration_scopes = sso:account:access
+""")
+
+    assert load_ini(ini_file) == {
+        "profile test": {
+            "sso_session": "test",
+            "s3": "\n  max_concurrent_requests = 20",
+        },
+        "sso-session test": {
+            "sso_start_url": "https://example.awsapps.com/start",
+            "sso_registration_scopes": "sso:account:access",
+        },
+    }
+
+
+def test_parse_ini_configparser_syntax():
+    """Test colon delimiters, indented keys and keys containing spaces."""
+    assert (
+        parse_ini("""[profile keep]
+  output = json
+region: us-east-1
+  s3 = nested
+my key = a=b
+""")
+        == {
+            "profile keep": {
+                "output": "json",
+                "region": "us-east-1\n  s3 = nested",
+                "my key": "a=b",
+            }
+        }
+    )
+
+    # Uniformly indented keys are separate settings, not continuations
+    assert (
+        parse_ini("""[profile foo]
+    sso_session = x
+    sso_account_id = 123
+    s3 =
+      addressing_style = path
+""")
+        == {
+            "profile foo": {
+                "sso_session": "x",
+                "sso_account_id": "123",
+                "s3": "\n      addressing_style = path",
+            }
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "text", ["region = us-east-1\n", "[profile test]\nnot a setting\n"]
+)
+def test_parse_ini_rejects_unparseable_lines(text):
+    """Test that lines outside a section or without a delimiter raise."""
+    with pytest.raises(ValueError):
+        parse_ini(text)
+
+
+# KeeManager
+
+
+def test_read_profile_info_sso_session(aws_cfg):
+    """Test reading profiles that share an sso-session section."""
+    with open(aws_cfg, "w") as f:
+        f.write("""[profile one]
+sso_session = shared
+sso_account_id = 111111111111
+
+[profile two]
+sso_session = shared
+sso_account_id = 222222222222
+
+[sso-session shared]
+sso_start_url = https://example.awsapps.com/start
+sso_region = eu-west-1
+""")
+
+    manager = KeeManager()
+    one = manager._read_profile_info("one")
+    two = manager._read_profile_info("two")
+
+    assert one["sso_account_id"] == "111111111111"
+    assert two["sso_account_id"] == "222222222222"
+    for info in (one, two):
+        assert info["session_name"] == "shared"
+        assert info["sso_start_url"] == "https://example.awsapps.com/start"
+        assert info["sso_region"] == "eu-west-1"
+
+
+def test_add_account_sso_failure(home, monkeypatch, capsys):
+    """Test account addition when SSO configuration fails."""
+    monkeypatch.setattr(
+        kee.subprocess, "run", lambda *a, **k: SimpleNamespace(returncode=1)
+    )
+
+    manager = KeeManager()
+
+    result = manager.add_account("test-account")
+
+    assert result is False
+
+    # Check that failure message was printed
+    assert " [X] SSO configuration failed.\n" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "returncode, expected, expected_runs", [(0, True, 1), (1, False, 2)]
+)
+def test_check_credentials_rc(returncode, expected, expected_runs, home, monkeypatch):
+    """Test the probe's exit status; only valid credentials are cached."""
+    runs = []
+    monkeypatch.setattr(
+        kee.subprocess,
+        "run",
+        lambda *a, **k: runs.append(a) or SimpleNamespace(returncode=returncode),
+    )
+
+    manager = KeeManager()
+    assert manager._check_credentials("test-profile") is expected
+    assert manager._check_credentials("test-profile") is expected
+    assert len(runs) == expected_runs
+
+
+@pytest.mark.parametrize("returncode, expected", [(0, True), (1, False)])
+def test_sso_login(returncode, expected, home, monkeypatch):
+    """Test that SSO login follows the login command's exit status."""
+    monkeypatch.setattr(
+        kee.subprocess, "run", lambda *a, **k: SimpleNamespace(returncode=returncode)
+    )
+
+    manager = KeeManager()
+    assert manager._sso_login("test-profile") is expected
+
+
+@pytest.fixture
+def kee_config_mock():
+    """A spec'd KeeConfig stand-in, fresh for each test."""
+    return Mock(spec=KeeConfig)
+
+
+@pytest.fixture
+def kee_manager(request, kee_config_mock, monkeypatch):
+    """A KeeManager wired to mocked configs; ``accounts`` via indirect param."""
+    accounts = getattr(request, "param", {})
+    kee_config_mock.load_config.return_value = {"accounts": dict(accounts)}
+    aws_config_mock = Mock(spec=AWSConfigManager)
+    monkeypatch.setattr(kee, "KeeConfig", lambda: kee_config_mock)
+    monkeypatch.setattr(kee, "AWSConfigManager", lambda: aws_config_mock)
+    return KeeManager(), kee_config_mock, aws_config_mock
+
+
+class FakeKeeConfig:
+    """KeeConfig stand-in with no accounts that never touches the disk."""
+
+    def load_config(self):
+        return _empty_config()
+
+    def save_config(self, config):
+        pass
+
+    def load_current(self):
+        return None
+
+    def save_current(self, name):
+        pass
+
+
+@pytest.fixture
+def fake_kee_config(monkeypatch):
+    """Install FakeKeeConfig as kee.KeeConfig for the test."""
+    monkeypatch.setattr(kee, "KeeConfig", FakeKeeConfig)
+
+
+class _Proc:
+    returncode = 0
+
+
+def test_add_account_success(kee_manager, monkeypatch, capsys):
+    """Test successful account addition."""
+    manager, config, _ = kee_manager
+    runs, reads, checks = [], [], []
+    monkeypatch.setattr(
+        kee.subprocess, "run", lambda *a, **k: runs.append(a) or _Proc()
+    )
+    monkeypatch.setattr(
+        KeeManager,
+        "_read_profile_info",
+        lambda self, profile: reads.append(profile)
+        or {
             "sso_session": "test",
             "sso_account_id": "123456789012",
             "sso_role_name": "TestRole",
             "output": "json",
-        }
+        },
+    )
+    monkeypatch.setattr(
+        KeeManager,
+        "_check_credentials",
+        lambda self, profile: checks.append(profile) or True,
+    )
 
-        mock_check_creds.return_value = True
+    result = manager.add_account("test-account")
 
-        mock_config_instance = Mock()
-        mock_config_instance.load_config.return_value = {
-            "accounts": {},
-            "current_account": None,
-        }
-        mock_kee_config.return_value = mock_config_instance
-
-        mock_aws_config_instance = Mock()
-        mock_aws_config.return_value = mock_aws_config_instance
-
-        manager = KeeManager()
-
-        with patch("builtins.print") as mock_print:
-            result = manager.add_account("test-account")
-
-        self.assertTrue(result)
-        mock_subprocess.assert_called_once()
-        mock_read_profile.assert_called_once_with("test-account")
-        mock_check_creds.assert_called_once_with("test-account")
-        mock_config_instance.save_config.assert_called_once()
-
-        # Check that success messages were printed
-        print_calls = []
-        for call in mock_print.call_args_list:
-            if call[0]:  # Check if call has positional arguments
-                print_calls.append(str(call[0][0]))
-
-        self.assertTrue(any("[✓]" in msg for msg in print_calls))
-
-    @patch("kee.subprocess.run")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_add_account_sso_failure(
-        self, mock_aws_config, mock_kee_config, mock_subprocess
-    ):
-        """Test account addition when SSO configuration fails."""
-        mock_subprocess.return_value.returncode = 1
-
-        manager = KeeManager()
-
-        with patch("builtins.print") as mock_print:
-            result = manager.add_account("test-account")
-
-        self.assertFalse(result)
-
-        # Check that failure message was printed
-        print_calls = []
-        for call in mock_print.call_args_list:
-            if call[0]:  # Check if call has positional arguments
-                print_calls.append(str(call[0][0]))
-
-        self.assertTrue(any("[X]" in msg and "failed" in msg for msg in print_calls))
-
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_list_accounts_empty(self, mock_aws_config, mock_kee_config):
-        """Test listing accounts when none are configured."""
-        mock_config_instance = Mock()
-        mock_config_instance.load_config.return_value = {
-            "accounts": {},
-            "current_account": None,
-        }
-        mock_kee_config.return_value = mock_config_instance
+    assert result
+    assert len(runs) == 1
+    assert reads == ["test-account"]
+    assert checks == ["test-account"]
+    config.save_config.assert_called_once()
+
+    # Check that success messages were printed
+    assert "[✓]" in capsys.readouterr().out
 
-        manager = KeeManager()
 
-        with patch("builtins.print") as mock_print:
-            manager.list_accounts()
+def test_list_accounts_empty(kee_manager, capsys):
+    """Test listing accounts when none are configured."""
+    manager, _, _ = kee_manager
 
-        mock_print.assert_called_with(
-            "\n No accounts configured. Use '\x1b[1;37mkee add <account_name>\x1b[0m' to add an account."
-        )
+    manager.list_accounts()
 
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_list_accounts_with_data(self, mock_aws_config, mock_kee_config):
-        """Test listing accounts with configured accounts."""
-        test_accounts = {
+    assert capsys.readouterr().out == _MSG_NO_ACCOUNTS
+
+
+@pytest.mark.parametrize(
+    "kee_manager",
+    [
+        {
             "test-account": {
                 "sso_account_id": "123456789012",
                 "sso_role_name": "TestRole",
             }
         }
-
-        mock_config_instance = Mock()
-        mock_config_instance.load_config.return_value = {
-            "accounts": test_accounts,
-            "current_account": "test-account",
-        }
-        mock_kee_config.return_value = mock_config_instance
-
-        manager = KeeManager()
-
-        with patch("builtins.print") as mock_print:
-            manager.list_accounts()
-
-        # Check that account information was printed
-        print_calls = []
-        for call in mock_print.call_args_list:
-            if call[0]:  # Check if call has positional arguments
-                print_calls.append(call[0][0])
-
-        self.assertTrue(any("test-account" in str(msg) for msg in print_calls))
-        self.assertTrue(any("Current profile" in str(msg) for msg in print_calls))
-        self.assertTrue(any("123456789012" in str(msg) for msg in print_calls))
-
-    @patch("builtins.input")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_remove_account_not_found(
-        self, mock_aws_config, mock_kee_config, mock_input
-    ):
-        """Test removing account that doesn't exist."""
-        mock_config_instance = Mock()
-        mock_config_instance.load_config.return_value = {
-            "accounts": {},
-            "current_account": None,
+    ],
+    indirect=True,
+)
+def test_list_accounts_with_data(kee_manager, capsys):
+    """Test listing accounts with configured accounts."""
+    manager, config, _ = kee_manager
+    config.load_current.return_value = "test-account"
+
+    manager.list_accounts()
+
+    # Check that account information was printed
+    output = capsys.readouterr().out
+
+    assert "test-account" in output
+    assert "Current profile" in output
+    assert "123456789012" in output
+
+
+@pytest.mark.parametrize(
+    "kee_manager",
+    [
+        {
+            "valid": {
+                "profile_name": "valid",
+                "sso_account_id": "111111111111",
+                "sso_role_name": "TestRole",
+            },
+            "expired": {
+                "profile_name": "expired",
+                "sso_account_id": "222222222222",
+                "sso_role_name": "TestRole",
+            },
         }
-        mock_kee_config.return_value = mock_config_instance
-
-        manager = KeeManager()
-
-        with patch("builtins.print") as mock_print:
-            result = manager.remove_account("nonexistent")
-
-        self.assertFalse(result)
-        mock_print.assert_called_with(
-            "\n Account '\x1b[1;37mnonexistent\x1b[0m' not found."
-        )
-
-    @patch("builtins.input", return_value="n")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_remove_account_cancelled(
-        self, mock_aws_config, mock_kee_config, mock_input
-    ):
-        """Test removing account when user cancels."""
-        test_accounts = {
-            "test-account": {"profile_name": "test-account", "session_name": ""}
+    ],
+    indirect=True,
+)
+@patch("kee.KeeManager._check_credentials")
+def test_list_accounts_check(mock_check_creds, kee_manager, capsys):
+    """Test listing accounts with credential checks."""
+    manager, _, _ = kee_manager
+    mock_check_creds.side_effect = lambda profile: profile == "valid"
+
+    manager.list_accounts(check=True)
+
+    output = capsys.readouterr().out
+
+    assert f" {_BOLD}valid{_RESET} [✓]\n" in output
+    assert f" {_BOLD}expired{_RESET} [X]\n" in output
+    assert mock_check_creds.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "kee_manager",
+    [
+        {
+            "one": {
+                "profile_name": "one",
+                "sso_account_id": "111111111111",
+                "sso_role_name": "TestRole",
+            }
         }
+    ],
+    indirect=True,
+)
+def test_list_accounts_check_without_aws_cli(kee_manager, home, monkeypatch, capsys):
+    """Test that a missing AWS CLI marks accounts invalid instead of failing."""
+    manager, _, _ = kee_manager
 
-        mock_config_instance = Mock()
-        mock_config_instance.load_config.return_value = {
-            "accounts": test_accounts,
-            "current_account": None,
-        }
-        mock_kee_config.return_value = mock_config_instance
+    def missing_aws(*args, **kwargs):
+        raise FileNotFoundError(2, "No such file or directory", "aws")
+
+    monkeypatch.setattr(kee.subprocess, "run", missing_aws)
+
+    manager.list_accounts(check=True)
+
+    output = capsys.readouterr().out
+    assert f" {_BOLD}one{_RESET} [X]\n" in output
+    assert "111111111111" in output
+
+
+@patch("builtins.input")
+def test_remove_account_not_found(mock_input, kee_manager, capsys):
+    """Test removing account that doesn't exist."""
+    manager, _, _ = kee_manager
+
+    result = manager.remove_account("nonexistent")
+
+    assert not result
+    mock_input.assert_not_called()
+    assert capsys.readouterr().out == _MSG_NOT_FOUND
+
+
+@pytest.mark.parametrize(
+    "kee_manager",
+    [{"test-account": {"profile_name": "test-account", "session_name": ""}}],
+    indirect=True,
+)
+@patch("builtins.input", return_value="n")
+def test_remove_account_cancelled(mock_input, kee_manager):
+    """Test removing account when user cancels."""
+    manager, config, _ = kee_manager
 
-        manager = KeeManager()
-        result = manager.remove_account("test-account")
+    result = manager.remove_account("test-account")
 
-        self.assertFalse(result)
-        mock_config_instance.save_config.assert_not_called()
+    assert not result
+    config.save_config.assert_not_called()
 
-    @patch("builtins.input", return_value="y")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_remove_account_success(self, mock_aws_config, mock_kee_config, mock_input):
-        """Test successful account removal."""
-        test_accounts = {
+
+@pytest.mark.parametrize(
+    "kee_manager",
+    [
+        {
             "test-account": {
                 "profile_name": "test-account",
                 "session_name": "test-session",
             }
         }
+    ],
+    indirect=True,
+)
+@patch("builtins.input", return_value="y")
+def test_remove_account_success(mock_input, kee_manager, capsys):
+    """Test successful account removal."""
+    manager, config, aws_config = kee_manager
+    config.load_current.return_value = "test-account"
+
+    result = manager.remove_account("test-account")
+
+    assert result
+    aws_config.remove_profile.assert_called_once_with("test-account")
+    config.save_config.assert_called_once()
+    config.save_current.assert_called_once_with(None)
+
+    # Check success message
+    assert f" [✓] Profile '{_BOLD}test-account{_RESET}' has been removed.\n" in (
+        capsys.readouterr().out
+    )
 
-        mock_config_instance = Mock()
-        mock_config_instance.load_config.return_value = {
-            "accounts": test_accounts,
-            "current_account": None,
-        }
-        mock_kee_config.return_value = mock_config_instance
 
-        mock_aws_config_instance = Mock()
-        mock_aws_config.return_value = mock_aws_config_instance
+@pytest.mark.parametrize(
+    "kee_manager", [{"test-account": {"profile_name": "test-account"}}], indirect=True
+)
+@patch("kee.KeeManager._sso_login")
+@patch("kee.KeeManager._start_subshell")
+def test_use_account_success(mock_subshell, mock_sso_login, kee_manager, monkeypatch):
+    """Test successful account usage."""
+    manager, config, _ = kee_manager
+    checks = []
+    monkeypatch.setattr(
+        KeeManager,
+        "_check_credentials",
+        lambda self, profile: checks.append(profile) or True,
+    )
+    monkeypatch.delenv("KEE_ACTIVE_PROFILE", raising=False)
+    monkeypatch.delenv("KEE_CURRENT_ACCOUNT", raising=False)
 
-        manager = KeeManager()
+    result = manager.use_account("test-account")
 
-        with patch("builtins.print") as mock_print:
-            result = manager.remove_account("test-account")
+    assert result
+    assert checks == ["test-account"]
+    mock_sso_login.assert_not_called()
+    mock_subshell.assert_called_once_with("test-account", "test-account")
+    assert config.save_current.call_args_list == [
+        call("test-account"),
+        call(None),
+    ]
+    config.save_config.assert_not_called()
 
-        self.assertTrue(result)
-        mock_aws_config_instance.remove_profile.assert_called_once_with("test-account")
-        mock_config_instance.save_config.assert_called_once()
 
-        # Check success message
-        print_calls = []
-        for call in mock_print.call_args_list:
-            if call[0]:  # Check if call has positional arguments
-                print_calls.append(str(call[0][0]))
+def test_use_account_already_in_session(fake_kee_config, monkeypatch, capsys):
+    """Test using account when already in a session."""
+    monkeypatch.setenv("KEE_ACTIVE_PROFILE", "1")
+    monkeypatch.setenv("KEE_CURRENT_ACCOUNT", "existing")
+    manager = KeeManager()
 
-        self.assertTrue(any("[✓]" in msg and "removed" in msg for msg in print_calls))
+    result = manager.use_account("test-account")
 
-    @patch.dict(
-        os.environ, {"KEE_ACTIVE_PROFILE": "1", "KEE_CURRENT_ACCOUNT": "existing"}
-    )
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_use_account_already_in_session(self, mock_aws_config, mock_kee_config):
-        """Test using account when already in a session."""
-        manager = KeeManager()
-
-        with patch("builtins.print") as mock_print:
-            result = manager.use_account("test-account")
-
-        self.assertFalse(result)
-        print_calls = []
-        for call in mock_print.call_args_list:
-            if call[0]:  # Check if call has positional arguments
-                print_calls.append(str(call[0][0]))
-
-        self.assertTrue(
-            any(
-                "You are using a \x1b[1;37mKee\x1b[0m profile: \x1b[1;37mexisting\x1b[0m"
-                in msg
-                for msg in print_calls
-            )
-        )
-
-    @patch("kee.subprocess.run")
-    @patch("kee.KeeManager._check_credentials")
-    @patch("kee.KeeManager._sso_login")
-    @patch("kee.KeeManager._start_subshell")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_use_account_success(
-        self,
-        mock_aws_config,
-        mock_kee_config,
-        mock_subshell,
-        mock_sso_login,
-        mock_check_creds,
-        mock_subprocess,
-    ):
-        """Test successful account usage."""
-        test_accounts = {"test-account": {"profile_name": "test-account"}}
-
-        mock_config_instance = Mock()
-        mock_config_instance.load_config.return_value = {
-            "accounts": test_accounts,
-            "current_account": None,
-        }
-        mock_kee_config.return_value = mock_config_instance
+    assert not result
+    assert _MSG_IN_SESSION in capsys.readouterr().out
+
+
+def test_current_account_in_session(fake_kee_config, monkeypatch, capsys):
+    """Test showing current account when using a profile."""
+    monkeypatch.setenv("KEE_ACTIVE_PROFILE", "1")
+    monkeypatch.setenv("KEE_CURRENT_ACCOUNT", "test-account")
+    manager = KeeManager()
+
+    manager.current_account()
+
+    assert _MSG_CURRENT in capsys.readouterr().out
+
+
+def test_init(fake_kee_config):
+    """Test KeeManager initialization."""
+    manager = KeeManager()
 
-        mock_check_creds.return_value = True
+    assert isinstance(manager.config, FakeKeeConfig)
+    assert isinstance(manager.aws_config, AWSConfigManager)
 
-        manager = KeeManager()
 
-        with patch.dict(os.environ, {}, clear=True):
-            result = manager.use_account("test-account")
+@pytest.mark.skipif(os.name == "nt", reason="posix_spawnp is POSIX only")
+@patch("kee.os.waitpid")
+@patch("kee.os.posix_spawnp", return_value=4242)
+def test_run_shell_posix_spawn(mock_spawn, mock_waitpid, fake_kee_config):
+    """Test that the sub-shell is spawned directly and waited for."""
+    env = {"AWS_PROFILE": "test-profile"}
 
-        self.assertTrue(result)
-        mock_check_creds.assert_called_once_with("test-account")
-        mock_subshell.assert_called_once_with("test-account", "test-account")
-        mock_config_instance.save_config.assert_called()
+    manager = KeeManager()
+    manager._run_shell("/bin/sh", env)
 
-    @patch.dict(
-        os.environ, {"KEE_ACTIVE_PROFILE": "1", "KEE_CURRENT_ACCOUNT": "test-account"}
+    mock_spawn.assert_called_once_with(
+        "/bin/sh", ["/bin/sh"], env, setsigdef=(signal.SIGPIPE, signal.SIGXFSZ)
     )
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_current_account_in_session(self, mock_aws_config, mock_kee_config):
-        """Test showing current account when using a profile."""
-        manager = KeeManager()
-
-        with patch("builtins.print") as mock_print:
-            manager.current_account()
-
-        print_calls = []
-        for call in mock_print.call_args_list:
-            if call[0]:  # Check if call has positional arguments
-                print_calls.append(str(call[0][0]))
-
-        self.assertTrue(
-            any(
-                "Current profile: \x1b[1;37mtest-account\x1b[0m" in msg
-                for msg in print_calls
-            )
-        )
-
-    @patch("kee.subprocess.run")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_check_credentials_success(
-        self, mock_aws_config, mock_kee_config, mock_subprocess
-    ):
-        """Test credential checking success."""
-        mock_subprocess.return_value.returncode = 0
-
-        manager = KeeManager()
-        result = manager._check_credentials("test-profile")
-
-        self.assertTrue(result)
-        mock_subprocess.assert_called_once()
-
-    @patch("kee.subprocess.run")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_check_credentials_failure(
-        self, mock_aws_config, mock_kee_config, mock_subprocess
-    ):
-        """Test credential checking failure."""
-        mock_subprocess.return_value.returncode = 1
-
-        manager = KeeManager()
-        result = manager._check_credentials("test-profile")
-
-        self.assertFalse(result)
-
-    @patch("kee.subprocess.run")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_sso_login_success(self, mock_aws_config, mock_kee_config, mock_subprocess):
-        """Test SSO login success."""
-        mock_subprocess.return_value.returncode = 0
-
-        manager = KeeManager()
-        result = manager._sso_login("test-profile")
-
-        self.assertTrue(result)
-
-    @patch("kee.subprocess.run")
-    @patch("kee.KeeConfig")
-    @patch("kee.AWSConfigManager")
-    def test_sso_login_failure(self, mock_aws_config, mock_kee_config, mock_subprocess):
-        """Test SSO login failure."""
-        mock_subprocess.return_value.returncode = 1
-
-        manager = KeeManager()
-        result = manager._sso_login("test-profile")
-
-        self.assertFalse(result)
-
-
-if __name__ == "__main__":
-    # Run tests with verbose output
-    unittest.main(verbosity=2)
+    mock_waitpid.assert_called_once_with(4242, 0)